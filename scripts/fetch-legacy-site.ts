@@ -19,17 +19,51 @@
  *   --single=URL       只抓取单个页面（调试用）
  */
 
-import * as cheerio from "cheerio";
-import { writeFileSync } from "fs";
+// slim 构建用 htmlparser2 解析（比默认 parse5 快数倍），对爬虫场景的容错足够
+import * as cheerio from "cheerio/slim";
+import { createHash } from "crypto";
+import { createWriteStream } from "fs";
 
 // ─── 配置 ────────────────────────────────────────────────
 
 const BASE_URL = process.env.LEGACY_VIDEO_SITE_URL || "https://old-video-site.example.com";
+/** 站点名（空页的 og:title 往往只剩它，用于过滤） */
+const SITE_NAME = BASE_URL.split("//")[1]?.split(".")[0] || "";
 const HEADERS: Record<string, string> = {
   "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36",
   Accept: "text/html,application/xhtml+xml",
   "Accept-Language": "zh-CN,zh;q=0.9",
 };
+/** 正常文章页远大于此值（Content-Length 为压缩后字节数），更小的响应直接当垃圾页丢弃 */
+const MIN_HTML_BYTES = 2000;
+
+// ─── 预编译正则（模块级，避免每次调用重建） ──────────────
+
+/** 从标题提取作者的候选模式，按优先级依次尝试 */
+const AUTHOR_PATTERNS = [
+  /【[^】]+】\s*([^「（【\n]+?)\s*[「（]/,
+  /【[^】]+】\s*([^-–\n]+?)\s*[-–]\s*第?\d/,
+  /【[^】]+】\s*([A-Za-z0-9_\-\s]+?)(?:\s*$|\s*[-–])/,
+  /【[^】]+】\s*([^\s「【\-（]+)/,
+];
+
+const ARCHIVE_ID_RE = /\/archives\/(\d+)\.html/;
+const GOTO_URL_RE = /goto\?url=([A-Za-z0-9+/=]+)/;
+// cover 与 fields 合并为单一交替正则，整段脚本内容只扫一趟
+const JOE_CONTENT_RE = /Joe\.CONTENT\.(?:cover\s*=\s*`([^`]*)`|fields\s*=\s*(\{[\s\S]*?\});)/g;
+const TITLE_SUFFIX_RE = /\s*[-|]\s*\S+映阁.*$/;
+const KEYWORD_SPLIT_RE = /[,，]/;
+const TAG_PREFIX_RE = /^#\s*/;
+const AUTHOR_INTRO_RE = /label="作者介绍"\}([\s\S]*?)\{\/tabs-pane\}/;
+const HTML_TAG_RE = /<[^>]+>/g;
+const SHORTCODE_RE = /\{[^}]+\}/g;
+const MD_BOLD_RE = /\*\*([^*]+)\*\*/g;
+const EXTRA_NEWLINE_RE = /\n{3,}/g;
+const EPISODE_NUM_RE = /第(\d+)集/;
+// 匹配 [第N集--副标题](url) 或 [短片--副标题](url)
+const MD_EPISODE_RE = /\[(?:第(\d+)集|([^\]]+?))(?:--([^\]]*))?\]\((https?:\/\/[^)]+)\)/g;
+const TIMESTAMP_RE = /[T:]/g;
+const LINE_START_RE = /^/gm;
 
 // 从命令行参数解析配置
 function parseArgs() {
@@ -83,34 +117,44 @@ interface VideoInfo {
   authorIntro: string;
   pageUrl: string;
   error?: string;
+  /** 标题是否来自 h1/og:title（<title> 兜底不算，ID 扫描据此判定空页） */
+  hasRealTitle?: boolean;
 }
 
 // ─── 并发控制 ────────────────────────────────────────────
 
-async function poolAll<T>(
-  tasks: (() => Promise<T>)[],
+/** 以固定并发对 items 逐个执行 worker，结果按原顺序返回（map 式接口，无需为每个条目预建闭包） */
+async function poolAll<I, T>(
+  items: I[],
+  worker: (item: I) => Promise<T>,
   concurrency: number,
   onDone?: (result: T, index: number, total: number) => void,
 ): Promise<T[]> {
-  const results: T[] = new Array(tasks.length);
+  const results: T[] = new Array(items.length);
   let next = 0;
   let done = 0;
 
   async function run() {
-    while (next < tasks.length) {
+    while (next < items.length) {
       const i = next++;
-      results[i] = await tasks[i]();
+      results[i] = await worker(items[i]);
       done++;
-      onDone?.(results[i], done, tasks.length);
+      onDone?.(results[i], done, items.length);
     }
   }
 
-  await Promise.all(Array.from({ length: Math.min(concurrency, tasks.length) }, () => run()));
+  await Promise.all(Array.from({ length: Math.min(concurrency, items.length) }, () => run()));
   return results;
 }
 
 // ─── 带重试的 fetch ──────────────────────────────────────
 
+/** 确定性的非文章页响应（类型/大小不对），重试也不会变，直接放弃 */
+class NonArticleError extends Error {}
+
+// Node 的 fetch（undici）默认按源站做 keep-alive 连接池，数百个页面都打同一
+// 主机时可复用 TCP+TLS 连接。但未消费的响应体会让底层 socket 无法归还连接池，
+// 导致每次非 2xx 响应都重新握手 —— 抛错前必须先 cancel 掉 body。
 async function fetchWithRetry(url: string, timeout: number, retries = 3): Promise<string> {
   for (let attempt = 0; attempt < retries; attempt++) {
     try {
@@ -122,10 +166,20 @@ async function fetchWithRetry(url: string, timeout: number, retries = 3): Promis
         signal: controller.signal,
       });
       clearTimeout(timer);
-      if (!res.ok) throw new Error(`HTTP ${res.status}`);
+      if (!res.ok) {
+        await res.body?.cancel().catch(() => {});
+        throw new Error(`HTTP ${res.status}`);
+      }
+      // 明显不是文章页（非 HTML、或响应过小）时跳过 body 解码与后续解析
+      const contentType = res.headers.get("content-type") ?? "";
+      const contentLength = Number(res.headers.get("content-length") ?? Number.NaN);
+      if ((contentType && !contentType.includes("text/html")) || contentLength < MIN_HTML_BYTES) {
+        await res.body?.cancel().catch(() => {});
+        throw new NonArticleError(`非文章页响应 (${contentType || "未知类型"}, ${contentLength || "?"} 字节)`);
+      }
       return await res.text();
     } catch (e) {
-      if (attempt === retries - 1) throw e;
+      if (e instanceof NonArticleError || attempt === retries - 1) throw e;
     }
   }
   throw new Error("unreachable");
@@ -137,72 +191,118 @@ function sleep(ms: number) {
 
 // ─── 从标题提取作者 ──────────────────────────────────────
 
+/** 重跑或多集再爬时同一标题会反复出现，缓存命中即跳过整个正则级联 */
+const authorCache = new Map<string, string>();
+const AUTHOR_CACHE_MAX = 4096;
+
 function extractAuthor(title: string): string {
-  const patterns = [
-    /【[^】]+】\s*([^「（【\n]+?)\s*[「（]/,
-    /【[^】]+】\s*([^-–\n]+?)\s*[-–]\s*第?\d/,
-    /【[^】]+】\s*([A-Za-z0-9_\-\s]+?)(?:\s*$|\s*[-–])/,
-    /【[^】]+】\s*([^\s「【\-（]+)/,
-  ];
-  for (const re of patterns) {
-    const m = title.match(re);
-    if (m) {
-      const author = m[1].trim();
-      if (author.length >= 2 && author.length <= 50) return author;
+  const cached = authorCache.get(title);
+  if (cached !== undefined) return cached;
+
+  let author = "未分类";
+  // 四个模式都以【xx】前缀开头，先用 includes 短路，无前缀的标题完全不走正则
+  if (title.includes("【")) {
+    for (const re of AUTHOR_PATTERNS) {
+      const m = title.match(re);
+      if (m) {
+        const candidate = m[1].trim();
+        if (candidate.length >= 2 && candidate.length <= 50) {
+          author = candidate;
+          break;
+        }
+      }
     }
   }
-  return "未分类";
+
+  // 容量封顶，满了逐出最早写入的条目
+  if (authorCache.size >= AUTHOR_CACHE_MAX) {
+    authorCache.delete(authorCache.keys().next().value as string);
+  }
+  authorCache.set(title, author);
+  return author;
 }
 
 // ─── 按 ID 扫描发现有效文章 ──────────────────────────────
 
-/** 逐个检测 archives ID 是否有内容（有标题即为有效），返回有效文章的 URL 列表 */
+/** 探测单个 archives ID：页面只抓取一次，有内容就地全量解析（null = 空页或请求失败） */
+async function probeArticle(id: number, timeout: number): Promise<VideoInfo | null> {
+  const url = `${BASE_URL}/index.php/archives/${id}.html`;
+  try {
+    const html = await fetchWithRetry(url, timeout);
+    const info = extractFromHtml(html, url, String(id));
+    // 解析异常原样上报，最终计入失败数（不可与空页混淆）
+    if (info.error) return info;
+    // 仅认 h1/og:title 的标题，<title> 兜底或只含站点名的视为空页
+    if (!info.hasRealTitle) return null;
+    return info;
+  } catch {
+    // 请求失败与空页同样计入连续空页（与原扫描一致），不单独计入失败数
+    return null;
+  }
+}
+
+/**
+ * 检测 archives ID 是否有内容（有标题即为有效），返回解析完成的 VideoInfo 列表
+ *
+ * 每个页面只下载、解析一次（探测与提取共用同一份 HTML）。
+ * 各 worker 空闲即领取下一个 ID（无分窗屏障，慢响应不会卡住整批）；
+ * 完成的结果按 ID 顺序消费，保持「连续 N 个空页停止」的语义
+ * （停止时最多多探测 concurrency 个页面）
+ */
 async function discoverArticlesByIdScan(
   startId: number,
   maxId: number,
   maxEmpty: number,
   concurrency: number,
   timeout: number,
-): Promise<string[]> {
-  const validUrls: string[] = [];
+): Promise<VideoInfo[]> {
+  const videos: VideoInfo[] = [];
+  const pending = new Map<number, VideoInfo | null>(); // 已完成但尚未按序消费的结果
+  let orderedId = startId; // 下一个待按序消费的 ID
   let consecutiveEmpty = 0;
-
-  for (let id = startId; id <= maxId; id++) {
-    const url = `${BASE_URL}/index.php/archives/${id}.html`;
-    try {
-      const html = await fetchWithRetry(url, timeout);
-      const $ = cheerio.load(html);
-      const title =
-        $("h1.joe_detail__title").text().trim() || $('meta[property="og:title"]').attr("content")?.trim() || "";
-      const hasTitle = title.length > 0 && !title.includes(BASE_URL.split("//")[1]?.split(".")[0] || "");
-
-      if (hasTitle) {
-        validUrls.push(url);
+  let stopped = false;
+
+  // 按 ID 顺序消费已完成的结果，维护连续空页计数
+  function drainInOrder() {
+    while (!stopped && pending.has(orderedId)) {
+      const info = pending.get(orderedId)!;
+      pending.delete(orderedId);
+      if (info) {
+        videos.push(info);
         consecutiveEmpty = 0;
-        process.stdout.write(`  [${id}] ✓ ${title.slice(0, 30)}\n`);
+        const status = info.error ? `✗ ${info.error}` : info.videoUrl || info.episodes.length > 0 ? "✓" : "✗ 无视频";
+        process.stdout.write(`  [${orderedId}] ${status} ${info.title.slice(0, 30)}\n`);
       } else {
         consecutiveEmpty++;
         if (consecutiveEmpty >= maxEmpty) {
-          console.log(`  连续 ${maxEmpty} 个空页，停止扫描（最后 ID: ${id}）`);
-          break;
+          console.log(`  连续 ${maxEmpty} 个空页，停止扫描（最后 ID: ${orderedId}）`);
+          stopped = true;
         }
       }
-    } catch {
-      consecutiveEmpty++;
-      if (consecutiveEmpty >= maxEmpty) {
-        console.log(`  连续 ${maxEmpty} 个无效页，停止扫描（最后 ID: ${id}）`);
-        break;
-      }
+      orderedId++;
     }
   }
 
-  return validUrls;
+  const ids = Array.from({ length: maxId - startId + 1 }, (_, i) => startId + i);
+  await poolAll(
+    ids,
+    async (id) => {
+      if (stopped) return;
+      pending.set(id, await probeArticle(id, timeout));
+      drainInOrder();
+    },
+    concurrency,
+  );
+
+  return videos;
 }
 
 // ─── 解码 goto 跳转链接中的 base64 URL ──────────────────
 
 function decodeGotoUrl(raw: string): string {
-  const m = raw.match(/goto\?url=([A-Za-z0-9+/=]+)/);
+  // 多数下载链接是直链，先用 includes 短路再走正则
+  if (!raw.includes("goto?url=")) return raw;
+  const m = raw.match(GOTO_URL_RE);
   if (m) {
     try {
       return Buffer.from(m[1], "base64").toString("utf-8");
@@ -215,12 +315,13 @@ function decodeGotoUrl(raw: string): string {
 
 // ─── 从视频页面提取信息 ──────────────────────────────────
 
-async function extractFromPage(pageUrl: string, timeout: number): Promise<VideoInfo> {
-  const idMatch = pageUrl.match(/\/archives\/(\d+)\.html/);
-  const videoId = idMatch?.[1] ?? String(pageUrl.length);
-
-  const base: VideoInfo = {
-    id: videoId,
+/** 构造仅含 ID 与页面地址的空 VideoInfo（解析失败时作为兜底返回值）
+ *
+ * 调用方已知 archives ID 时直接传入，免去对 URL 的重复正则解析。
+ * 非标准 URL 兜底用 md5 前缀，保证同一 URL 多次运行得到同一 ID（可跨次去重） */
+function emptyVideoInfo(pageUrl: string, id?: string): VideoInfo {
+  return {
+    id: id ?? pageUrl.match(ARCHIVE_ID_RE)?.[1] ?? createHash("md5").update(pageUrl).digest("hex").slice(0, 8),
     title: "",
     author: "",
     description: "",
@@ -233,28 +334,38 @@ async function extractFromPage(pageUrl: string, timeout: number): Promise<VideoI
     authorIntro: "",
     pageUrl,
   };
+}
+
+/** 对已抓取的 HTML 做全量解析（纯 CPU，不发网络请求） */
+function extractFromHtml(html: string, pageUrl: string, id?: string): VideoInfo {
+  const base = emptyVideoInfo(pageUrl, id);
 
   try {
-    const html = await fetchWithRetry(pageUrl, timeout);
     const $ = cheerio.load(html);
 
     // ── 先解析 Joe.CONTENT 脚本块（结构化数据源） ──
-    const scriptContent = $("script")
-      .toArray()
-      .map((el) => $(el).html() ?? "")
-      .join("\n");
-
-    // Joe.CONTENT.cover — 最可靠的封面来源
-    const joeContentCover = scriptContent.match(/Joe\.CONTENT\.cover\s*=\s*`([^`]*)`/)?.[1] ?? "";
+    // Joe.CONTENT.cover（最可靠的封面来源）与 Joe.CONTENT.fields（JSON 结构化字段）
+    // 逐个 script 原地扫描（不拼接成大字符串），各取首个匹配，两个值齐了就提前收工
+    let joeContentCover = "";
+    let fieldsRaw = "";
+    for (const el of $("script").toArray()) {
+      const scriptContent = $(el).html();
+      if (!scriptContent || !scriptContent.includes("Joe.CONTENT")) continue;
+      JOE_CONTENT_RE.lastIndex = 0;
+      let jm: RegExpExecArray | null;
+      while ((jm = JOE_CONTENT_RE.exec(scriptContent)) !== null) {
+        if (jm[1] !== undefined) joeContentCover = joeContentCover || jm[1];
+        else fieldsRaw = fieldsRaw || jm[2];
+      }
+      if (joeContentCover && fieldsRaw) break;
+    }
 
-    // Joe.CONTENT.fields — JSON 结构化字段
     let fieldsAbstract = "";
     let fieldsKeywords = "";
     let fieldsVideo = "";
-    const fieldsMatch = scriptContent.match(/Joe\.CONTENT\.fields\s*=\s*(\{[\s\S]*?\});/);
-    if (fieldsMatch) {
+    if (fieldsRaw) {
       try {
-        const fields = JSON.parse(fieldsMatch[1]);
+        const fields = JSON.parse(fieldsRaw);
         fieldsAbstract = fields.abstract ?? fields.description ?? "";
         fieldsKeywords = fields.keywords ?? "";
         fieldsVideo = fields.video ?? "";
@@ -264,12 +375,11 @@ async function extractFromPage(pageUrl: string, timeout: number): Promise<VideoI
     }
 
     // ── 标题 ──
-    const title = (
-      $("h1.joe_detail__title").text().trim() ||
-      $('meta[property="og:title"]').attr("content")?.trim() ||
-      $("title").text().trim() ||
-      ""
-    ).replace(/\s*[-|]\s*\S+映阁.*$/, "");
+    // 空页判定只认 h1/og:title：每个 200 响应都有 <title>，不能作为有效文章的依据
+    const rawTitle =
+      $("h1.joe_detail__title").text().trim() || $('meta[property="og:title"]').attr("content")?.trim() || "";
+    const hasRealTitle = rawTitle.length > 0 && !(SITE_NAME && rawTitle.includes(SITE_NAME));
+    const title = (rawTitle || $("title").text().trim() || "").replace(TITLE_SUFFIX_RE, "");
 
     if (!title) return { ...base, error: "无标题" };
 
@@ -283,17 +393,18 @@ async function extractFromPage(pageUrl: string, timeout: number): Promise<VideoI
     // ── 关键词 ──
     const keywords: string[] = fieldsKeywords
       ? fieldsKeywords
-          .split(/[,，]/)
+          .split(KEYWORD_SPLIT_RE)
           .map((k: string) => k.trim())
           .filter(Boolean)
       : [];
 
-    // ── 标签 ──
-    const tags: string[] = [];
+    // ── 标签（Set 去重并保持页面出现顺序） ──
+    const tagSet = new Set<string>();
     $(".article-tags a").each((_, el) => {
-      const text = $(el).text().replace(/^#\s*/, "").trim();
-      if (text && !tags.includes(text)) tags.push(text);
+      const text = $(el).text().replace(TAG_PREFIX_RE, "").trim();
+      if (text) tagSet.add(text);
     });
+    const tags = [...tagSet];
 
     // ── 封面（优先 Joe.CONTENT.cover，再 og:image） ──
     const coverUrl =
@@ -323,19 +434,21 @@ async function extractFromPage(pageUrl: string, timeout: number): Promise<VideoI
     let authorIntro = "";
     // Joe 主题的 tabs-pane 会渲染成 HTML，查找含"作者介绍"标签的内容区
     const articleHtml = $("article.joe_detail__article").html() ?? "";
-    const authorIntroMatch = articleHtml.match(/label="作者介绍"\}([\s\S]*?)\{\/tabs-pane\}/);
+    // 文章体可达几十 KB，先 includes 探一下标记再跑捕获正则
+    const authorIntroMatch = articleHtml.includes('label="作者介绍"') ? articleHtml.match(AUTHOR_INTRO_RE) : null;
     if (authorIntroMatch) {
       // 清理 HTML/短代码，保留纯文本
       authorIntro = authorIntroMatch[1]
-        .replace(/<[^>]+>/g, "")
-        .replace(/\{[^}]+\}/g, "")
-        .replace(/\*\*([^*]+)\*\*/g, "$1")
-        .replace(/\n{3,}/g, "\n\n")
+        .replace(HTML_TAG_RE, "")
+        .replace(SHORTCODE_RE, "")
+        .replace(MD_BOLD_RE, "$1")
+        .replace(EXTRA_NEWLINE_RE, "\n\n")
         .trim();
     }
 
     // ── 剧集（核心：多层兜底） ──
     const episodes: Episode[] = [];
+    const seenNums = new Set<number>();
 
     // 方式 1：从剧集列表 <a class="switch-video" video-url="..." data-index="N" data-title="...">
     $("a.switch-video[video-url]").each((_, el) => {
@@ -348,7 +461,7 @@ async function extractFromPage(pageUrl: string, timeout: number): Promise<VideoI
       let num = dataIndex ? Number(dataIndex) : 0;
       if (!num) {
         const epText = $el.text().trim();
-        const numMatch = epText.match(/第(\d+)集/);
+        const numMatch = epText.match(EPISODE_NUM_RE);
         if (!numMatch) return;
         num = Number(numMatch[1]);
       }
@@ -372,7 +485,8 @@ async function extractFromPage(pageUrl: string, timeout: number): Promise<VideoI
       const epCover =
         $el.attr("data-cover")?.trim() || $el.find(".video-thumbnail-right img").attr("src")?.trim() || "";
 
-      if (num > 0 && !episodes.some((e) => e.num === num)) {
+      if (num > 0 && !seenNums.has(num)) {
+        seenNums.add(num);
         episodes.push({
           num,
           title: subTitle || `第${num}集`,
@@ -384,11 +498,11 @@ async function extractFromPage(pageUrl: string, timeout: number): Promise<VideoI
 
     // 方式 2：从 Joe.CONTENT.fields.video（Markdown 链接 [第N集--标题](url)）
     if (episodes.length === 0 && fieldsVideo) {
-      // 匹配 [第N集--副标题](url) 或 [短片--副标题](url)
-      const mdRe = /\[(?:第(\d+)集|([^\]]+?))(?:--([^\]]*))?\]\((https?:\/\/[^)]+)\)/g;
+      // 带 g 标志的正则在模块级复用，exec 前必须重置游标
+      MD_EPISODE_RE.lastIndex = 0;
       let m: RegExpExecArray | null;
       let autoNum = 0;
-      while ((m = mdRe.exec(fieldsVideo)) !== null) {
+      while ((m = MD_EPISODE_RE.exec(fieldsVideo)) !== null) {
         autoNum++;
         const num = m[1] ? Number(m[1]) : autoNum;
         const prefix = m[2] ?? "";
@@ -397,7 +511,8 @@ async function extractFromPage(pageUrl: string, timeout: number): Promise<VideoI
 
         const epTitle = subtitle ? (prefix ? `${prefix} - ${subtitle}` : subtitle) : prefix || `第${num}集`;
 
-        if (!episodes.some((e) => e.num === num)) {
+        if (!seenNums.has(num)) {
+          seenNums.add(num);
           episodes.push({ num, title: epTitle, videoUrl: url, coverUrl: "" });
         }
       }
@@ -414,7 +529,7 @@ async function extractFromPage(pageUrl: string, timeout: number): Promise<VideoI
     episodes.sort((a, b) => a.num - b.num);
 
     return {
-      id: videoId,
+      id: base.id,
       title,
       author: extractAuthor(title),
       description,
@@ -426,6 +541,7 @@ async function extractFromPage(pageUrl: string, timeout: number): Promise<VideoI
       downloads,
       authorIntro,
       pageUrl,
+      hasRealTitle,
     };
   } catch (e) {
     return {
@@ -435,6 +551,19 @@ async function extractFromPage(pageUrl: string, timeout: number): Promise<VideoI
   }
 }
 
+/** 抓取并解析单个页面（单页调试模式用） */
+async function extractFromPage(pageUrl: string, timeout: number): Promise<VideoInfo> {
+  try {
+    const html = await fetchWithRetry(pageUrl, timeout);
+    return extractFromHtml(html, pageUrl);
+  } catch (e) {
+    return {
+      ...emptyVideoInfo(pageUrl),
+      error: e instanceof Error ? e.message : String(e),
+    };
+  }
+}
+
 // ─── 生成批量导入文本 ────────────────────────────────────
 
 interface ExportVideo {
@@ -453,6 +582,16 @@ interface ExportSeries {
   videos: ExportVideo[];
 }
 
+/** 组装导出视频的 extraInfo（无内容时返回 undefined，避免输出空对象） */
+function buildExtraInfo(vi: VideoInfo, seriesAuthor: string): Record<string, unknown> | undefined {
+  const info: Record<string, unknown> = {};
+  if (vi.authorIntro) info.authorIntro = vi.authorIntro;
+  if (vi.author && vi.author !== seriesAuthor) info.author = vi.author;
+  if (vi.keywords.length > 0) info.keywords = vi.keywords;
+  if (vi.downloads.length > 0) info.downloads = vi.downloads;
+  return Object.keys(info).length > 0 ? info : undefined;
+}
+
 function generateImportJson(videos: VideoInfo[]): {
   data: { series: ExportSeries[] };
   videoCount: number;
@@ -473,33 +612,25 @@ function generateImportJson(videos: VideoInfo[]): {
   for (const [author, vids] of [...grouped.entries()].sort((a, b) => a[0].localeCompare(b[0]))) {
     const ref = vids[0];
 
-    // 合并 tags + keywords 去重
-    const allTags = [...ref.tags];
-    for (const kw of ref.keywords) {
-      if (!allTags.includes(kw)) allTags.push(kw);
-    }
+    // 合并 tags + keywords 去重（Set 保持插入顺序，tags 优先）
+    const allTags = [...new Set([...ref.tags, ...ref.keywords])];
 
     const seriesDesc = ref.authorIntro || ref.description || undefined;
 
+    const tagNames = allTags.length > 0 ? allTags : undefined;
     const seriesVideos: ExportVideo[] = [];
 
     for (const v of vids) {
-      const buildExtraInfo = (vi: VideoInfo): Record<string, unknown> | undefined => {
-        const info: Record<string, unknown> = {};
-        if (vi.authorIntro) info.authorIntro = vi.authorIntro;
-        if (vi.author && vi.author !== author) info.author = vi.author;
-        if (vi.keywords.length > 0) info.keywords = vi.keywords;
-        if (vi.downloads.length > 0) info.downloads = vi.downloads;
-        return Object.keys(info).length > 0 ? info : undefined;
-      };
+      // extraInfo 与具体剧集无关，按视频计算一次，各集复用同一对象
+      const extraInfo = buildExtraInfo(v, author);
 
       const addEpisode = (ep: Episode) => {
         seriesVideos.push({
           title: `${v.title} - ${ep.title}`,
           coverUrl: ep.coverUrl || undefined,
           videoUrl: ep.videoUrl,
-          tagNames: allTags.length > 0 ? allTags : undefined,
-          extraInfo: buildExtraInfo(v),
+          tagNames,
+          extraInfo,
         });
         videoCount++;
       };
@@ -516,8 +647,8 @@ function generateImportJson(videos: VideoInfo[]): {
           description: v.description || undefined,
           coverUrl: v.coverUrl || undefined,
           videoUrl: v.videoUrl,
-          tagNames: allTags.length > 0 ? allTags : undefined,
-          extraInfo: buildExtraInfo(v),
+          tagNames,
+          extraInfo,
         });
         videoCount++;
       }
@@ -536,6 +667,27 @@ function generateImportJson(videos: VideoInfo[]): {
   return { data: { series: seriesList }, videoCount };
 }
 
+// ─── 流式写出导入 JSON ──────────────────────────────────
+
+/** 逐个合集写出，避免对整个导出结果做一次性 stringify（大抓取时峰值内存减半），输出格式不变 */
+function writeImportJson(outputFile: string, seriesList: ExportSeries[]): Promise<void> {
+  return new Promise((resolve, reject) => {
+    const out = createWriteStream(outputFile, "utf-8");
+    out.on("error", reject);
+    if (seriesList.length === 0) {
+      out.write('{\n  "series": []\n}');
+    } else {
+      out.write('{\n  "series": [\n');
+      seriesList.forEach((series, i) => {
+        const json = JSON.stringify(series, null, 2).replace(LINE_START_RE, "    ");
+        out.write(i > 0 ? `,\n${json}` : json);
+      });
+      out.write("\n  ]\n}");
+    }
+    out.end(() => resolve());
+  });
+}
+
 // ─── 主流程 ──────────────────────────────────────────────
 
 async function main() {
@@ -579,9 +731,9 @@ async function main() {
   );
   console.log("─".repeat(50));
 
-  // 1) 按 ID 顺序扫描发现有效文章
-  console.log("发现文章...");
-  const uniqueLinks = await discoverArticlesByIdScan(
+  // 1) 按 ID 顺序扫描：每个页面只抓取一次，发现有效文章时就地解析
+  console.log("发现并解析文章...");
+  const videos = await discoverArticlesByIdScan(
     config.startId,
     config.maxId,
     config.maxEmpty,
@@ -589,34 +741,30 @@ async function main() {
     config.timeout,
   );
 
-  console.log(`\n共发现 ${uniqueLinks.length} 篇有效文章（每篇 = 1 个作者合集，可含多集）`);
-  console.log("─".repeat(50));
-
-  // 2) 并发抓取详情页
-  const tasks = uniqueLinks.map((link) => () => extractFromPage(link, config.timeout));
-
-  const videos = await poolAll(tasks, config.concurrency, (result, done, total) => {
-    const status = result.error
-      ? `✗ ${result.error}`
-      : result.videoUrl || result.episodes.length > 0
-        ? "✓"
-        : "✗ 无视频";
-    const name = result.title ? result.title.slice(0, 30) : "未知";
-    console.log(`[${done}/${total}] ${name} ${status}`);
-  });
-
+  console.log(`\n共发现 ${videos.length} 篇有效文章（每篇 = 1 个作者合集，可含多集）`);
   console.log("─".repeat(50));
 
-  // 3) 统计
-  const validCount = videos.filter((v) => v.title && !v.error).length;
-  const noVideoCount = videos.filter((v) => v.title && !v.error && !v.videoUrl && v.episodes.length === 0).length;
-  const errorCount = videos.filter((v) => v.error).length;
-  const totalEpisodes = videos
-    .filter((v) => v.title && !v.error)
-    .reduce(
-      (sum, v) => sum + (v.episodes.length > 1 ? v.episodes.filter((e) => e.videoUrl).length : v.videoUrl ? 1 : 0),
-      0,
-    );
+  // 2) 统计（单次遍历，谓词只算一遍）
+  // 注意：扫描阶段的请求失败按空页处理，失败数只反映 HTML 解析异常
+  let validCount = 0;
+  let noVideoCount = 0;
+  let errorCount = 0;
+  let totalEpisodes = 0;
+  for (const v of videos) {
+    if (v.error) {
+      errorCount++;
+      continue;
+    }
+    if (!v.title) continue;
+    validCount++;
+    if (v.episodes.length > 1) {
+      totalEpisodes += v.episodes.filter((e) => e.videoUrl).length;
+    } else if (v.videoUrl) {
+      totalEpisodes++;
+    } else if (v.episodes.length === 0) {
+      noVideoCount++;
+    }
+  }
 
   const elapsed = ((performance.now() - startTime) / 1000).toFixed(1);
 
@@ -626,12 +774,12 @@ async function main() {
   console.log(`  无视频: ${noVideoCount}`);
   console.log(`  失败数: ${errorCount}`);
 
-  // 4) 生成导入 JSON 并保存
+  // 3) 生成导入 JSON 并保存
   const { data: importData, videoCount } = generateImportJson(videos);
-  const timestamp = new Date().toISOString().replace(/[T:]/g, "_").slice(0, 19);
+  const timestamp = new Date().toISOString().replace(TIMESTAMP_RE, "_").slice(0, 19);
   const outputFile = `legacy_videos_${timestamp}.json`;
 
-  writeFileSync(outputFile, JSON.stringify(importData, null, 2), "utf-8");
+  await writeImportJson(outputFile, importData.series);
   console.log(`\n已保存到: ${outputFile}`);
   console.log(`导出合集数: ${importData.series.length}`);
   console.log(`导出视频数: ${videoCount}`);